@@ -0,0 +1,66 @@
+'''
+Time and memory of loading the Cues of a long recording: the generic tree parser against parse_cues() / CueIndex,
+plus the cost of a seek lookup. Uses a synthetic Cues element, one cue point per frame.
+
+    python benchmarks/bench_cues.py [--hours 1] [--fps 30]
+'''
+import argparse
+import gc
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests"))
+from mkv_reader import CueIndex, TRACK, parse_cues, read_ebml_element_header, read_ebml_element_tree
+from synthetic import encode_cues
+
+def measure(fn):
+    '''
+    Returns (result, seconds, bytes still allocated afterwards, peak bytes).
+    Timed and traced in separate runs, as tracemalloc slows down allocations a lot.
+    '''
+    gc.collect()
+    t0 = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - t0
+    del result
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    (current, peak) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (result, seconds, current, peak)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hours", type=float, default=1.0)
+    parser.add_argument("--fps", type=int, default=30)
+    args = parser.parse_args()
+
+    n = int(args.hours*3600*args.fps)
+    period = int(round(1000000/args.fps)) # TimestampScale of 1 us, as in Azure Kinect recordings
+    # no zero-valued CueTime, which read_ebml_element_tree() can't read
+    f = io.BytesIO(encode_cues([((i+1)*period, 1000 + i*370000) for i in range(n)], TRACK.COLOR))
+    (_, size, _) = read_ebml_element_header(f)
+    body = f.read(size)
+    print(f"{n} cue points, {len(body)/1e6:.1f} MB of Cues")
+
+    (tree, seconds, current, peak) = measure(lambda: read_ebml_element_tree(io.BytesIO(body), len(body)))
+    print(f"read_ebml_element_tree: {seconds:.3f} s, {current/1e6:.1f} MB retained, {peak/1e6:.1f} MB peak")
+    del tree
+    (index, seconds, current, peak) = measure(lambda: CueIndex(*parse_cues(body), timecode_scale=1000))
+    print(f"parse_cues + CueIndex:  {seconds:.3f} s, {current/1e6:.1f} MB retained, {peak/1e6:.1f} MB peak")
+
+    lookups = 10000
+    duration = n/args.fps
+    for track in (None, TRACK.COLOR):
+        t0 = time.perf_counter()
+        for i in range(lookups):
+            index.find(i*duration/lookups, track)
+        print(f"CueIndex.find(track={track}): {(time.perf_counter()-t0)/lookups*1e6:.1f} us per lookup")
+
+if __name__ == "__main__":
+    main()
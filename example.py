@@ -21,10 +21,12 @@ while True:
 	except EOFError:
 		break
 
-	# 'frameset' is a dictionary object
-	# In addition to 'index' and 'timestamp', track numbers, if available, are also keys
+	# 'frameset' is a Frameset object, which can be indexed like a dictionary
+	# In addition to 'index' and 'timestamp' (of the Matroska cluster), track numbers, if available, are also keys
 	# e.g., to get the infrared image of the frameset (KeyError is raised if a track doesn't exist in a frameset)
 	ir_img = frameset[TRACK.IR]
+	# Per-track timestamps, durations and block flags are available as well
+	ir_timestamp = frameset.timestamps[TRACK.IR]
 
 	# Note: the color image may NOT be in some framesets, especially at the beginning and/or end of the MKV file
 	# This happens, I suppose, when the Depth/IR sensor turns on/off a fraction of a second before/after the color sensor, but seems normal
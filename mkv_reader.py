@@ -1,9 +1,18 @@
 import sys
 import os
-from struct import unpack
+import time
+import mmap
+import threading
+import argparse
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from collections import deque
+from struct import unpack, pack
+from array import array
 import datetime
 import binascii
 import json
+import io
 import cv2
 import numpy as np
 
@@ -517,78 +526,534 @@ def read_ebml_element_tree(f, total_size):
             (type_, name) = element_types_names[id_]
         data = read_simple_element(f, type_, size)
         total_size-=(size+hsize)
-        childs.append((name, (type_, data))) 
+        childs.append((name, (type_, data)))
     return childs
-                
 
-class MKVReader():
-    timecode_scale = 1000000
-    current_cluster_timecode = 0
-    frameset_num = 0
+def parse_element_header(data, pos):
+    '''
+        Parse Element ID and size from buffer[pos:], with a fast path for the common 1-byte IDs and sizes
+        Returns id, element size plus the new position in input buffer
+    '''
+    b = data[pos]
+    if b & 0x80:
+        id_ = b
+        pos+=1
+    else:
+        (id_, pos) = parse_matroska_number(data, pos, unmodified=True)
+    b = data[pos]
+    if b & 0x80 and b != 0xFF:
+        return (id_, b & 0x7F, pos+1)
+    (size, pos) = parse_matroska_number(data, pos)
+    return (id_, size, pos)
+
+def find_cluster(data, start=0, end=None, min_timecode=None):
+    '''
+        Search buffer (bytes or mmap) from start for the next plausible Cluster, using bulk byte search for the Cluster ID.
+        Plausible means: followed by a size that fits in the buffer (or is unknown) and a Timestamp as first child,
+        which is at least min_timecode if given.
+        Returns (offset, timecode) or (None, None)
+    '''
+    length = len(data)
+    pos = start
+    while True:
+        pos = data.find(b"\x1F\x43\xB6\x75", pos, end if end is not None else length)
+        if pos == -1:
+            return (None, None)
+        try:
+            (size, p) = parse_matroska_number(data, pos+4)
+            if size == -1 or p+size <= length:
+                (id_, tsize, p) = parse_element_header(data, p)
+                if id_ == 0xE7 and tsize <= 8 and p+tsize <= length:
+                    timecode = int.from_bytes(data[p:p+tsize], "big")
+                    if min_timecode is None or timecode >= min_timecode:
+                        return (pos, timecode)
+        except Exception:
+            # not an EBML number, or running off the end of the buffer
+            pass
+        pos+=1
+
+def parse_seekhead(data):
+    '''
+        Parse the body of a SeekHead element from buffer
+        Returns dict of element ID -> position (relative to the Segment data start)
+    '''
+    positions = {}
+    pos = 0
+    end = len(data)
+    while pos < end:
+        (id_, size, pos) = parse_element_header(data, pos)
+        if size == -1 or pos+size > end:
+            sys.stderr.write("mkvparse: Damaged SeekHead? Ignoring the remaining %d bytes\n" % (end-pos))
+            break
+        if id_ == 0x4DBB: # Seek
+            (seek_id, seek_position) = (None, None)
+            seek_pos = pos
+            while seek_pos < pos+size:
+                (cid, csize, seek_pos) = parse_element_header(data, seek_pos)
+                if cid == 0x53AB: # SeekID
+                    seek_id = int.from_bytes(data[seek_pos:seek_pos+csize], "big")
+                elif cid == 0x53AC: # SeekPosition
+                    seek_position = int.from_bytes(data[seek_pos:seek_pos+csize], "big")
+                seek_pos+=csize
+            if seek_id is not None and seek_position is not None:
+                positions.setdefault(seek_id, seek_position)
+        pos+=size
+    return positions
+
+def parse_cues(data, segment_offset=0):
+    '''
+        Parse the body of a Cues element from buffer straight into flat arrays,
+        without building the (name, (type, value)) tree for every CuePoint.
+        Every CueTrackPositions becomes one row; missing CueRelativePosition is stored as -1.
+        segment_offset is added to CueClusterPosition to get absolute file offsets.
+
+        Returns tuple of NumPy arrays (times, tracks, cluster_positions, relative_positions)
+    '''
+    times = array("q")
+    tracks = array("q")
+    cluster_positions = array("q")
+    relative_positions = array("q")
+    from_bytes = int.from_bytes
+    pos = 0
+    end = len(data)
+    while pos < end:
+        (id_, size, pos) = parse_element_header(data, pos)
+        if size == -1 or pos+size > end:
+            sys.stderr.write("mkvparse: Damaged Cues? Ignoring the remaining %d bytes\n" % (end-pos))
+            break
+        if id_ != 0xBB: # not a CuePoint
+            pos+=size
+            continue
+        point_end = pos+size
+        cue_time = 0
+        rows = 0
+        while pos < point_end:
+            (cid, csize, pos) = parse_element_header(data, pos)
+            if cid == 0xB3: # CueTime
+                cue_time = from_bytes(data[pos:pos+csize], "big")
+            elif cid == 0xB7: # CueTrackPositions
+                track = 0
+                cluster_position = -1
+                relative_position = -1
+                tp_pos = pos
+                tp_end = pos+csize
+                while tp_pos < tp_end:
+                    (tid, tsize, tp_pos) = parse_element_header(data, tp_pos)
+                    if tid == 0xF7: # CueTrack
+                        track = from_bytes(data[tp_pos:tp_pos+tsize], "big")
+                    elif tid == 0xF1: # CueClusterPosition
+                        cluster_position = from_bytes(data[tp_pos:tp_pos+tsize], "big") + segment_offset
+                    elif tid == 0xF0: # CueRelativePosition
+                        relative_position = from_bytes(data[tp_pos:tp_pos+tsize], "big")
+                    tp_pos+=tsize
+                tracks.append(track)
+                cluster_positions.append(cluster_position)
+                relative_positions.append(relative_position)
+                rows+=1
+            pos+=csize
+        # CueTime may come after CueTrackPositions, so fill the times in afterwards
+        if rows == 1:
+            times.append(cue_time)
+        else:
+            times.extend([cue_time]*rows)
+    return (
+        np.frombuffer(times, dtype=np.int64),
+        np.frombuffer(tracks, dtype=np.int64),
+        np.frombuffer(cluster_positions, dtype=np.int64),
+        np.frombuffer(relative_positions, dtype=np.int64),
+    )
+
+class CueIndex():
+    '''
+        Random access index built from the Cues element.
+        times are in Segment timecode units (see TimestampScale), cluster positions are absolute file offsets.
+    '''
+    def __init__(self, times, tracks, cluster_positions, relative_positions, timecode_scale=1000000):
+        self.times = times
+        self.tracks = tracks
+        self.cluster_positions = cluster_positions
+        self.relative_positions = relative_positions
+        self.timecode_scale = timecode_scale
+        self.track_rows = {} # track -> (rows of its cues, their times), filled by find()
+
+    def __len__(self):
+        return len(self.times)
+
+    def get_timestamps(self):
+        '''
+            Returns the cue times in seconds
+        '''
+        return self.times*(self.timecode_scale*0.000000001)
+
+    def find(self, timestamp, track=None):
+        '''
+            Returns the row of the last cue at or before timestamp (in seconds), optionally only considering cues for track.
+            Timestamps before the first cue map to the first cue. Returns None if there are no (matching) cues.
+        '''
+        times = self.times
+        rows = None
+        if track is not None:
+            if track not in self.track_rows:
+                rows = np.flatnonzero(self.tracks == track)
+                self.track_rows[track] = (rows, times[rows])
+            (rows, times) = self.track_rows[track]
+        if len(times) == 0:
+            return None
+        timecode = int(round(timestamp/(self.timecode_scale*0.000000001)))
+        i = max(int(np.searchsorted(times, timecode, side="right"))-1, 0)
+        return int(rows[i]) if rows is not None else i
+
+    def get_cluster_position(self, timestamp, track=None):
+        '''
+            Returns the absolute file offset of the Cluster to start reading from to get timestamp (in seconds)
+        '''
+        i = self.find(timestamp, track)
+        if i is None:
+            return None
+        return int(self.cluster_positions[i])
+
+
+COLOR_FORMATS = ("bgr", "rgb", "gray", "yuv")
+
+class ColorDecoder():
+    '''
+        Color decoder backend: turns the compressed (MJPEG) color frames into images.
+        Output formats are "bgr", "rgb", "gray" (HxW) and "yuv" (HxWx3 full range Y, Cb, Cr).
+        Only the turbojpeg backend decodes "yuv" directly from the JPEG planes; the others decode to BGR/RGB
+        and convert back, so for them "yuv" is slower than "bgr".
+    '''
+    name = None
+
+    @classmethod
+    def is_available(cls):
+        return True
+
+    def decode(self, data, color_format="bgr"):
+        raise NotImplementedError()
+
+def bgr_to_yuv(img):
+    '''
+    Full range Y, Cb, Cr per pixel (OpenCV converts to Y, Cr, Cb), for backends without native YUV output
+    '''
+    (y, cr, cb) = cv2.split(cv2.cvtColor(img, cv2.COLOR_BGR2YCrCb))
+    return cv2.merge((y, cb, cr))
+
+class OpenCVColorDecoder(ColorDecoder):
+    name = "cv2"
+
+    def decode(self, data, color_format="bgr"):
+        buf = np.frombuffer(data, np.uint8)
+        if color_format == "gray":
+            return cv2.imdecode(buf, cv2.IMREAD_GRAYSCALE)
+        img = cv2.imdecode(buf, -1)
+        if img is None or color_format == "bgr":
+            return img
+        if color_format == "rgb":
+            return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        return bgr_to_yuv(img)
+
+class TurboJPEGColorDecoder(ColorDecoder):
+    '''
+        Decoder using libjpeg-turbo through PyTurboJPEG (optional dependency)
+    '''
+    name = "turbojpeg"
+
+    @classmethod
+    def is_available(cls):
+        try:
+            from turbojpeg import TurboJPEG
+            TurboJPEG()
+        except (ImportError, RuntimeError, OSError):
+            return False
+        return True
+
+    def __init__(self):
+        import turbojpeg
+        self.turbojpeg = turbojpeg
+        self.jpeg = turbojpeg.TurboJPEG()
+
+    def decode(self, data, color_format="bgr"):
+        if color_format == "rgb":
+            return self.jpeg.decode(data, pixel_format=self.turbojpeg.TJPF_RGB)
+        if color_format == "gray":
+            img = self.jpeg.decode(data, pixel_format=self.turbojpeg.TJPF_GRAY)
+            return np.ascontiguousarray(img.reshape(img.shape[:2]))
+        if color_format == "yuv":
+            return self.decode_yuv(data)
+        return self.jpeg.decode(data, pixel_format=self.turbojpeg.TJPF_BGR)
+
+    def decode_yuv(self, data):
+        '''
+        Decode straight to the Y, Cb, Cr planes of the JPEG (no color conversion),
+        upsampling subsampled chroma planes to full resolution by pixel replication
+        '''
+        (width, height, _, _) = self.jpeg.decode_header(data)
+        planes = self.jpeg.decode_to_yuv_planes(data)
+        y = planes[0]
+        if len(planes) == 1: # grayscale JPEG
+            chroma = np.full(y.shape, 128, np.uint8)
+            planes = [y, chroma, chroma]
+        (plane_height, plane_width) = y.shape
+        (cb, cr) = (p if p.shape == y.shape else cv2.resize(p, (plane_width, plane_height), interpolation=cv2.INTER_NEAREST) for p in planes[1:3])
+        img = cv2.merge((y, cb, cr))
+        if img.shape[:2] != (height, width): # planes padded to whole MCUs
+            img = np.ascontiguousarray(img[:height, :width])
+        return img
+
+class PillowColorDecoder(ColorDecoder):
+    '''
+        Decoder using Pillow (or Pillow-SIMD, optional dependency)
+    '''
+    name = "pillow"
+
+    @classmethod
+    def is_available(cls):
+        try:
+            import PIL.Image
+        except ImportError:
+            return False
+        return True
+
+    def __init__(self):
+        import PIL.Image
+        self.Image = PIL.Image
+
+    def decode(self, data, color_format="bgr"):
+        # np.asarray() of a PIL image is read-only, so copy into a writable array like the other backends return
+        img = self.Image.open(io.BytesIO(data))
+        if color_format == "gray":
+            return np.array(img.convert("L"))
+        if color_format == "yuv":
+            return np.array(img.convert("YCbCr"))
+        img = np.asarray(img.convert("RGB"))
+        if color_format == "bgr":
+            return np.ascontiguousarray(img[:, :, ::-1])
+        return np.array(img)
+
+class RawColorDecoder(ColorDecoder):
+    '''
+        Passthrough: returns the compressed frame bytes as they are
+    '''
+    name = "raw"
+
+    def decode(self, data, color_format="bgr"):
+        return data
+
+COLOR_DECODERS = {
+    "cv2": OpenCVColorDecoder,
+    "turbojpeg": TurboJPEGColorDecoder,
+    "pillow": PillowColorDecoder,
+    "raw": RawColorDecoder,
+}
+
+def available_color_decoders():
+    '''
+        Returns the names of the color decoder backends that can be used on this system
+    '''
+    return [name for (name, cls) in COLOR_DECODERS.items() if cls.is_available()]
+
+class Frameset():
+    '''
+        The frames read from one Cluster.
+        index and timestamp (in seconds) are those of the Cluster; track_frames holds one
+        (frame, timestamp in seconds, duration in seconds or None, flags byte of the block header) tuple per track number.
+        frames, timestamps, durations and flags are dicts keyed by track number, built from track_frames when accessed.
+        Can be indexed like the dict previously used for framesets: frameset[TRACK.DEPTH], frameset['index'], frameset['timestamp']
+    '''
+    __slots__ = ("index", "timestamp", "track_frames")
+
+    def __init__(self, index=0, timestamp=0.0):
+        self.index = index
+        self.timestamp = timestamp
+        self.track_frames = {}
+
+    def add_frame(self, track_id, frame, timestamp, duration=None, flags=0):
+        self.track_frames[track_id] = (frame, timestamp, duration, flags)
+
+    @property
+    def frames(self):
+        return {track_id: entry[0] for (track_id, entry) in self.track_frames.items()}
+
+    @property
+    def timestamps(self):
+        return {track_id: entry[1] for (track_id, entry) in self.track_frames.items()}
+
+    @property
+    def durations(self):
+        return {track_id: entry[2] for (track_id, entry) in self.track_frames.items()}
+
+    @property
+    def flags(self):
+        return {track_id: entry[3] for (track_id, entry) in self.track_frames.items()}
+
+    def __getitem__(self, key):
+        if key == 'index':
+            return self.index
+        if key == 'timestamp':
+            return self.timestamp
+        return self.track_frames[key][0]
+
+    def __contains__(self, key):
+        return key in self.track_frames or key in ('index', 'timestamp')
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return ['index', 'timestamp'] + list(self.track_frames)
+
+    def values(self):
+        return [self.index, self.timestamp] + [entry[0] for entry in self.track_frames.values()]
 
-    def __init__(self, filepath, track_filter=(), debug=False):
+    def items(self):
+        return [('index', self.index), ('timestamp', self.timestamp)] + [(track_id, entry[0]) for (track_id, entry) in self.track_frames.items()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return 2 + len(self.track_frames)
+
+    def is_keyframe(self, track_id):
+        return bool(self.track_frames[track_id][3] & 0x80)
+
+    def is_invisible(self, track_id):
+        return bool(self.track_frames[track_id][3] & 0x08)
+
+    def is_discardable(self, track_id):
+        return bool(self.track_frames[track_id][3] & 0x01)
+
+class MappedFile():
+    '''
+        Minimal read-only file object over a (shared) mmap, with a position of its own.
+        Reads slice the mmap instead of using the mmap's position, so several MappedFiles
+        over the same mmap can be used from different threads.
+    '''
+    def __init__(self, data, fileno=None):
+        self.data = data
+        self.pos = 0
+        self.closed = False
+        self._fileno = fileno
+
+    def read(self, size=-1):
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+        end = len(self.data) if size is None or size < 0 else self.pos+size
+        buf = self.data[self.pos:end]
+        self.pos+=len(buf)
+        return buf
+
+    def seek(self, offset, whence=0):
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+        if whence == 1:
+            offset+=self.pos
+        elif whence == 2:
+            offset+=len(self.data)
+        if offset < 0:
+            raise ValueError(f"negative seek position {offset}")
+        self.pos = offset
+        return self.pos
+
+    def tell(self):
+        return self.pos
+
+    def fileno(self):
+        return self._fileno
+
+    def close(self):
+        self.closed = True
+
+class Recording():
+    '''
+    An Azure Kinect MKV file, parsed once: Info, Tracks, calibration, the Cues index (parsed on first use)
+    and a single mmap of the file. It is not modified after construction (apart from loading the Cues, under a lock),
+    so one Recording can be shared by many cursors (MKVReader objects, see cursor()), e.g. one per thread.
+    '''
+    def __init__(self, filepath):
         self.filepath = os.path.realpath(filepath)
         self.filename = os.path.basename(self.filepath)
         self.file = open(self.filepath, "rb")
-        self.debug = debug
-
+        self.mmap = None
         try:
-            self.track_filter = set(track_filter)
-        except TypeError:
-            self.track_filter = set((track_filter,))
-        
-        # Note: reading IMU data from MKV is not currently implemented (but can VERY easily be implemented in several ways)
-        # This is because IMU track data occurs several times – whereas image track data only occurs once (per track) – for each Matroska cluster.
-        # Thus, the definition of "frameset" must be more explicitly defined if one wants to include IMU data.
-        # Currently, a frameset is parsed from a single Matroska cluster.
-        # Currently, an Azure MKV cluster either contains 0 (rare) or exactly 1 (common, barring frame drop) images per each type of track (color, depth, IR).
-        # Please contact the repo maintainer and/or file an issue for more information!
-        if TRACK.IMU in self.track_filter:
-            raise ValueError("Reading Azure Kinect DK IMU data is currently not implemented!")
+            if os.fstat(self.file.fileno()).st_size == 0:
+                raise EOFError(f"Empty file '{self.filepath}'")
+            self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self.file.close()
+            raise
+        self.timecode_scale = 1000000
+        self.file_metadata = []
+        self.tracks = {}
+        self.calibration_raw = None
+        self.calibration = None
+        self.segment_offset = 0
+        self.seek_positions = {}
+        self.first_cluster_offset = None
+        self.cue_index = None
+        self.cue_lock = threading.Lock()
+        try:
+            self.read_metadata()
+        except BaseException:
+            self.close()
+            raise
 
-        self.read_metadata()
-        
-        if self.debug:
-            self.print_file_info()
-            self.print_metadata()
-    
-    def print_file_info(self, end=""):
-        print(f"Filename: {self.filename}")
-        print(f"Filepath: {self.filepath}")
-        print("Tracks:")
-        for k in self.tracks:
-            t=self.tracks[k]
-            print(f"\t{k}\t{t['Name'][1]}\t{t['type'][1]}\t{t['CodecID'][1]}")
-        if end:
-            print(end)
+    def __enter__(self):
+        return self
 
-    def print_metadata(self, end=""):
-        print("Metadata:")
-        for (k,(t_,v)) in self.file_metadata:
-            if t_ == EbmlElementType.BINARY: v = binascii.hexlify(v)
-            if t_ == EbmlElementType.DATE: v = str(datetime.datetime.utcfromtimestamp(v))
-            print(f"\t{k}: {v}")
-        if end:
-            print(end)
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.mmap.close()
+        self.file.close()
+
+    def open(self):
+        '''
+        Returns a new file object (with its own position) over the shared mmap
+        '''
+        return MappedFile(self.mmap, self.file.fileno())
+
+    def cursor(self, **kwargs):
+        '''
+        Returns a new MKVReader reading this Recording, see MKVReader for the arguments
+        '''
+        return MKVReader(self, **kwargs)
 
     def read_metadata(self):
-        while not self.file.closed:
+        f = self.open()
+        while True:
             (id_, size, hsize) = (None, None, None)
             tree = None
             data = None
             (type_, name) = (None, None)
             try:
-                (id_, size, hsize) = read_ebml_element_header(self.file)
+                (id_, size, hsize) = read_ebml_element_header(f)
                 (type_, name) = element_types_names[id_]
 
-                if type_ == EET.MASTER:
-                    tree = read_ebml_element_tree(self.file, size)
+                if name=="SeekHead":
+                    for (k, v) in parse_seekhead(f.read(size)).items():
+                        self.seek_positions.setdefault(k, v)
+                elif name=="Cues":
+                    # parsed on demand by get_cue_index()
+                    self.seek_positions.setdefault(id_, f.tell() - hsize - self.segment_offset)
+                    f.seek(size, 1)
+                    continue
+                elif type_ == EET.MASTER:
+                    tree = read_ebml_element_tree(f, size)
                     data = tree
 
             except StopIteration:
                 raise EOFError()
             
+            if name=="Segment":
+                self.segment_offset = f.tell()
+
             if name=="Cluster":
+                self.first_cluster_offset = f.tell() - hsize
                 return
             
             if name=="Attachments":
@@ -617,14 +1082,10 @@ class MKVReader():
                     self.timecode_scale = d["TimestampScale"][1] 
             elif name=="Tracks" and type(data) == list:
                 self.tracks={}
-                construct_track_filter = False
-                if len(self.track_filter) == 0:
-                    construct_track_filter = True
                 for (ten, (_t, track)) in tree:
                     if ten != "TrackEntry": continue
                     d = dict(track)
                     n = d['TrackNumber'][1]
-                    if construct_track_filter and n != TRACK.IMU: self.track_filter.add(n)
                     self.tracks[n]=d
                     tt = d['TrackType'][1]
                     if   tt==0x01: d['type']='video'
@@ -644,10 +1105,226 @@ class MKVReader():
                                     "to handle header removal compression\n")
             else:
                 if type_!=EET.JUST_GO_ON and type_!=EET.MASTER:
-                    data = read_simple_element(self.file, type_, size)
+                    data = read_simple_element(f, type_, size)
+
+    def find_cues_position(self, f):
+        '''
+        Returns the absolute file offset of the Cues element, or None if there is none.
+        Uses the SeekHead if it has an entry pointing to a Cues element,
+        otherwise hops over the top-level elements after the first Cluster.
+        '''
+        if 0x1C53BB6B in self.seek_positions:
+            position = self.segment_offset + self.seek_positions[0x1C53BB6B]
+            if position + 4 <= len(self.mmap) and self.mmap[position:position+4] == b"\x1C\x53\xBB\x6B":
+                return position
+            sys.stderr.write(f"mkvparse: Warning: SeekHead entry for Cues at offset {position} of '{self.filename}' is invalid, searching for Cues\n")
+        if self.first_cluster_offset is None:
+            return None
+        f.seek(self.first_cluster_offset)
+        while True:
+            try:
+                (id_, size, hsize) = read_ebml_element_header(f)
+            except StopIteration:
+                return None
+            if id_ == 0x1C53BB6B:
+                return f.tell() - hsize
+            if size == -1:
+                return None
+            f.seek(size, 1)
+
+    def get_cue_index(self):
+        '''
+        Returns the CueIndex of the file, parsing the Cues element on first use.
+        Raises LookupError if the file has no Cues.
+        '''
+        with self.cue_lock:
+            if self.cue_index is None:
+                f = self.open()
+                position = self.find_cues_position(f)
+                if position is None:
+                    raise LookupError(f"No Cues found in '{self.filename}'")
+                f.seek(position)
+                try:
+                    (id_, size, hsize) = read_ebml_element_header(f)
+                except StopIteration:
+                    raise LookupError(f"Truncated Cues element at offset {position} in '{self.filename}'")
+                if id_ != 0x1C53BB6B or size == -1 or position+hsize+size > len(self.mmap):
+                    raise LookupError(f"Bad Cues element at offset {position} in '{self.filename}'")
+                arrays = parse_cues(f.read(size), self.segment_offset)
+                self.cue_index = CueIndex(*arrays, timecode_scale=self.timecode_scale)
+        return self.cue_index
+
+class MKVReader():
+    '''
+    Cursor over a Recording: reads framesets starting from the first Cluster, keeping its own position and state.
+    recording can also be a file path, in which case a Recording is created for this reader only
+    and closed by close() or at the end of the file (seek() opens it again).
+    Several MKVReaders can share one Recording (see Recording.cursor()), but a single MKVReader is not meant
+    to be used from several threads at the same time.
+    '''
+    def __init__(self, recording, track_filter=(), debug=False, recover=False, color_decoder="cv2", color_format="bgr"):
+        self.owns_recording = not isinstance(recording, Recording)
+        if self.owns_recording:
+            recording = Recording(recording)
+        self.recording = recording
+        self.filepath = recording.filepath
+        self.filename = recording.filename
+        self.timecode_scale = recording.timecode_scale
+        self.file_metadata = recording.file_metadata
+        self.tracks = recording.tracks
+        self.calibration = recording.calibration
+        self.segment_offset = recording.segment_offset
+        self.seek_positions = recording.seek_positions
+        self.first_cluster_offset = recording.first_cluster_offset
+        self.file = recording.open()
+        if self.first_cluster_offset is not None:
+            self.file.seek(self.first_cluster_offset)
+        self.current_cluster_timecode = 0
+        self.frameset_num = 0
+        self.debug = debug
+        # skip damaged data instead of raising, see resync()
+        self.recover = recover
+        self.damaged_ranges = []
+        self.current_cluster_offset = None
+        self.current_cluster_end = None
+        self.last_frameset_timecode = None
+        self.last_frameset_num = 0
+        self.frameset_period = None
+        self.element_offset = None
+
+        try:
+            self.track_filter = set(track_filter)
+        except TypeError:
+            self.track_filter = set((track_filter,))
+        
+        # Note: reading IMU data from MKV is not currently implemented (but can VERY easily be implemented in several ways)
+        # This is because IMU track data occurs several times – whereas image track data only occurs once (per track) – for each Matroska cluster.
+        # Thus, the definition of "frameset" must be more explicitly defined if one wants to include IMU data.
+        # Currently, a frameset is parsed from a single Matroska cluster.
+        # Currently, an Azure MKV cluster either contains 0 (rare) or exactly 1 (common, barring frame drop) images per each type of track (color, depth, IR).
+        # Please contact the repo maintainer and/or file an issue for more information!
+        if TRACK.IMU in self.track_filter:
+            raise ValueError("Reading Azure Kinect DK IMU data is currently not implemented!")
+        if len(self.track_filter) == 0:
+            self.track_filter = set(n for n in self.tracks if n != TRACK.IMU)
+
+        # color_decoder is the name of a backend (see COLOR_DECODERS), a ColorDecoder, or "auto" to pick the fastest one
+        if color_format not in COLOR_FORMATS:
+            raise ValueError(f"Unknown color format '{color_format}', choose from {', '.join(COLOR_FORMATS)}")
+        self.color_format = color_format
+        self.color_decoder_timings = None
+        if color_decoder == "auto":
+            self.color_decoder = self.calibrate_color_decoder() if TRACK.COLOR in self.track_filter else OpenCVColorDecoder()
+        elif isinstance(color_decoder, ColorDecoder):
+            self.color_decoder = color_decoder
+        elif color_decoder in COLOR_DECODERS:
+            self.color_decoder = COLOR_DECODERS[color_decoder]()
+        else:
+            raise ValueError(f"Unknown color decoder '{color_decoder}', choose from {', '.join(COLOR_DECODERS)} or auto")
+        
+        if self.debug:
+            self.print_file_info()
+            self.print_metadata()
+    
+    def print_file_info(self, end=""):
+        print(f"Filename: {self.filename}")
+        print(f"Filepath: {self.filepath}")
+        print("Tracks:")
+        for k in self.tracks:
+            t=self.tracks[k]
+            print(f"\t{k}\t{t['Name'][1]}\t{t['type'][1]}\t{t['CodecID'][1]}")
+        if end:
+            print(end)
+
+    def print_metadata(self, end=""):
+        print("Metadata:")
+        for (k,(t_,v)) in self.file_metadata:
+            if t_ == EbmlElementType.BINARY: v = binascii.hexlify(v)
+            if t_ == EbmlElementType.DATE: v = str(datetime.datetime.utcfromtimestamp(v))
+            print(f"\t{k}: {v}")
+        if end:
+            print(end)
 
     def get_calibration(self):
         return self.calibration
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        '''
+        Close the file of this reader, and the Recording if it was created for this reader only
+        '''
+        self.file.close()
+        if self.owns_recording:
+            self.recording.close()
+
+    def reopen_recording(self):
+        if self.owns_recording and self.recording.mmap.closed:
+            self.recording = Recording(self.filepath)
+
+    def get_cue_index(self):
+        '''
+        Returns the CueIndex of the Recording, see Recording.get_cue_index()
+        '''
+        self.reopen_recording()
+        return self.recording.get_cue_index()
+
+    def calibrate_color_decoder(self, num_frames=5, repeat=3):
+        '''
+        Time every available color decoder backend (except raw) on the first num_frames color frames
+        and return (an instance of) the fastest one. Timings in seconds per frame end up in color_decoder_timings.
+        '''
+        reader = MKVReader(self.recording, track_filter=TRACK.COLOR, color_decoder="raw")
+        frames = []
+        for frameset in reader.iter_framesets():
+            frames.append(frameset[TRACK.COLOR])
+            if len(frames) >= num_frames:
+                break
+        if not frames:
+            return OpenCVColorDecoder()
+
+        self.color_decoder_timings = {}
+        for name in available_color_decoders():
+            if name == "raw":
+                continue
+            decoder = COLOR_DECODERS[name]()
+            try:
+                decoder.decode(frames[0], self.color_format)
+            except Exception as e:
+                sys.stderr.write(f"mkvparse: Color decoder {name} failed, skipping it: {e}\n")
+                continue
+            t0 = time.perf_counter()
+            for i in range(repeat):
+                for frame in frames:
+                    decoder.decode(frame, self.color_format)
+            self.color_decoder_timings[name] = (time.perf_counter()-t0)/(repeat*len(frames))
+        fastest = min(self.color_decoder_timings, key=self.color_decoder_timings.get, default="cv2")
+        if self.debug:
+            print(f"Color decoder timings: {self.color_decoder_timings}, using {fastest}")
+        return COLOR_DECODERS[fastest]()
+
+    def seek(self, timestamp, track=None):
+        '''
+        Position the reader so that the next get_next_frameset() returns the frameset of the Cluster
+        with the last cue at or before timestamp (in seconds, same clock as frameset['timestamp']).
+        Note: frameset['index'] keeps counting the framesets read, it is not reset by seeking.
+        Returns the cue time (in seconds) of the Cluster seeked to.
+        '''
+        cues = self.get_cue_index()
+        i = cues.find(timestamp, track)
+        if i is None:
+            raise LookupError(f"No cues for track {track} in '{self.filename}'")
+        if self.file.closed:
+            self.file = self.recording.open()
+        self.file.seek(int(cues.cluster_positions[i]))
+        self.current_cluster_offset = None
+        self.current_cluster_end = None
+        self.last_frameset_timecode = None
+        return cues.times[i]*(self.timecode_scale*0.000000001)
     
     def print_calibration(self, pretty=True):
         print("Calibration:")
@@ -656,12 +1333,12 @@ class MKVReader():
         else:
             print(self.calibration)
     
-    def handle_frame(self, track_id, timestamp, frameset, data, more_laced_frames, duration, keyframe, invisible, discardable):
+    def handle_frame(self, track_id, timestamp, frameset, data, more_laced_frames, duration, keyframe, invisible, discardable, flags=0):
         if self.file.closed:
             raise EOFError()
         if track_id not in self.track_filter:
             return
-        if track_id in frameset.keys():
+        if track_id in frameset.track_frames:
             raise RuntimeError(f"Track {track_id} already in current frameset! Should only be one frame per track per frameset.")
         addstr = f"dur={duration:6f}" if duration else ""
         if keyframe: addstr+=" key"
@@ -669,7 +1346,7 @@ class MKVReader():
         if discardable: addstr+=" disc"
         if self.debug: print(f"Frame for {track_id} ts={timestamp:06f} l={more_laced_frames} {addstr} len={len(data)} data={binascii.hexlify(data[0:10])}...")
         if track_id == TRACK.COLOR:
-            data = cv2.imdecode(np.frombuffer(data, np.uint8), -1)
+            data = self.color_decoder.decode(data, self.color_format)
         elif track_id in (TRACK.DEPTH, TRACK.IR):
             arr = np.frombuffer(data, dtype=">i2")
             # NFOV unbinned
@@ -684,11 +1361,14 @@ class MKVReader():
             # WFOV unbinned, Passive IR
             elif(arr.shape[0] == (1024*1024)):
                 data = arr.reshape(1024, 1024)
+            elif self.recover:
+                # most likely a block cut short by damage
+                raise RuntimeError(f"Depth/IR frame of track {track_id} has an unknown size of {len(data)} bytes")
             else:
                 print(f"ERROR: Received Depth/IR image in unknown format! Shape = {arr.shape}")
         
         if data is not None:
-            frameset[track_id] = data
+            frameset.add_frame(track_id, data, timestamp, duration, flags)
     
     def handle_block(self, buffer, cluster_timecode, frameset, timecode_scale=1000000, duration=None):
         '''
@@ -705,12 +1385,9 @@ class MKVReader():
 
         block_timecode = (cluster_timecode + tcode)*(timecode_scale*0.000000001)
 
-        frameset['index'] = self.frameset_num
-        frameset['timestamp'] = block_timecode
-
         if laceflags == 0x00: # no lacing
             buf = buffer[pos:]
-            return self.handle_frame(tracknum, block_timecode, frameset, buf, 0, duration, f_keyframe, f_invisible, f_discardable)
+            return self.handle_frame(tracknum, block_timecode, frameset, buf, 0, duration, f_keyframe, f_invisible, f_discardable, flags)
         
         if tracknum not in self.track_filter:
             return
@@ -748,48 +1425,243 @@ class MKVReader():
         for i in lengths:
             buf = buffer[pos:pos+i]
             pos+=i
-            self.handle_frame(tracknum, block_timecode, frameset, buf, more_laced_frames, duration, f_keyframe, f_invisible, f_discardable)
+            self.handle_frame(tracknum, block_timecode, frameset, buf, more_laced_frames, duration, f_keyframe, f_invisible, f_discardable, flags)
             more_laced_frames-=1
         
-    def get_next_frameset(self):
-        next_byte = self.file.read(1)
-        if not next_byte:
-            if not self.file.closed:
-                self.file.close()
-            else:
+    def peek_cluster(self):
+        '''
+        Hop over top-level elements up to the next Cluster and read its header and Timestamp only,
+        leaving the file positioned at the start of that Cluster.
+        Returns (offset just past the Cluster or None if its size is unknown, Cluster timecode or None)
+        With recover=True, damaged headers are skipped (see resync()) instead of raising an exception.
+        Raises EOFError if there are no more Clusters.
+        '''
+        while True:
+            try:
+                return self.read_cluster_header()
+            except EOFError:
+                raise
+            except Exception as e:
+                if not self.recover or self.file.closed:
+                    raise
+                self.resync(e)
+
+    def read_cluster_header(self):
+        if self.file.closed:
+            raise EOFError(f"Reached end of file '{self.filename}'")
+        file_size = len(self.recording.mmap)
+        while True:
+            start = self.file.tell()
+            self.element_offset = start
+            try:
+                (id_, size, hsize) = read_ebml_element_header(self.file)
+            except StopIteration:
+                self.close()
                 raise EOFError(f"Reached end of file '{self.filename}'")
-        else:
-            self.file.seek(-1, 1)
-        
-        frameset = {}
+            if self.recover and size != -1 and start+hsize+size > file_size:
+                raise RuntimeError(f"Element {id_:x} with size {size} at offset {start} extends past the end of the file")
+            if id_ == 0x1F43B675: # Cluster
+                break
+            if self.recover and id_ not in element_types_names:
+                raise RuntimeError(f"Unknown element {id_:x} at offset {start}")
+            if size == -1 or element_types_names.get(id_, (None, None))[0] == EET.JUST_GO_ON:
+                continue
+            self.file.seek(size, 1)
+        end = start+hsize+size if size != -1 else None
+        timecode = None
+        try:
+            (cid, csize, chsize) = read_ebml_element_header(self.file)
+            if cid == 0xE7: # Timestamp
+                timecode = read_fixedlength_number(self.file, csize, False)
+        except StopIteration:
+            pass
+        if self.recover and timecode is None:
+            raise RuntimeError(f"Cluster at offset {start} has no Timestamp")
+        self.file.seek(start)
+        return (end, timecode)
+
+    def pass_cluster(self, end, timecode):
+        '''
+        Move past a Cluster found by peek_cluster() without reading it.
+        '''
+        if timecode is not None:
+            self.last_frameset_timecode = timecode
+            self.last_frameset_num = self.frameset_num
+        self.file.seek(end)
+        self.frameset_num += 1
+
+    def skip_clusters(self, n=1):
+        '''
+        Skip the next n Clusters using the size from their element header, without reading their blocks.
+        Skipped Clusters still count towards frameset['index'].
+        Returns the number of Clusters skipped, which is less than n at the end of the file
+        or when a Cluster has an unknown size (and thus can only be skipped by parsing it).
+        '''
+        for i in range(n):
+            try:
+                (end, timecode) = self.peek_cluster()
+            except EOFError:
+                return i
+            if end is None:
+                return i
+            self.pass_cluster(end, timecode)
+        return n
+
+    def iter_framesets(self, step=1, target_fps=None):
+        '''
+        Generator over the remaining framesets, returning every step-th Cluster,
+        or roughly target_fps framesets per second of recording (overrides step).
+        Clusters in between are skipped as a whole (see skip_clusters()).
+        '''
+        if step < 1:
+            raise ValueError("step must be at least 1")
+        if target_fps is not None and target_fps <= 0:
+            raise ValueError("target_fps must be positive")
+        next_timestamp = None
+        while True:
+            try:
+                if target_fps is not None:
+                    while True:
+                        (end, timecode) = self.peek_cluster()
+                        if timecode is None:
+                            break
+                        timestamp = timecode*(self.timecode_scale*0.000000001)
+                        # allow for a bit of jitter in the Cluster timestamps
+                        if end is None or next_timestamp is None or timestamp >= next_timestamp - 0.001:
+                            break
+                        self.pass_cluster(end, timecode)
+                    if timecode is not None:
+                        if next_timestamp is None or next_timestamp + 1/target_fps <= timestamp + 0.001:
+                            next_timestamp = timestamp
+                        next_timestamp += 1/target_fps
+                frameset = self.get_next_frameset()
+            except EOFError:
+                return
+            yield frameset
+            if target_fps is None and step > 1:
+                self.skip_clusters(step-1)
+
+    def finish_frameset(self, frameset):
+        # Cluster spacing, per Cluster (skipped Clusters also count towards frameset_num)
+        if self.last_frameset_timecode is not None and self.current_cluster_timecode > self.last_frameset_timecode \
+                and self.frameset_num > self.last_frameset_num:
+            self.frameset_period = (self.current_cluster_timecode - self.last_frameset_timecode)/(self.frameset_num - self.last_frameset_num)
+        self.last_frameset_timecode = self.current_cluster_timecode
+        self.last_frameset_num = self.frameset_num
+        self.current_cluster_offset = None
+        frameset.index = self.frameset_num
+        self.frameset_num += 1
+        return frameset
+
+    def resync(self, error=None):
+        '''
+        Skip damaged data: search for the next plausible Cluster after the start of the Cluster being read
+        (see find_cluster()) and continue reading from there. The frameset being read is lost.
+        The skipped byte range is reported in damaged_ranges, together with an estimate of the number of framesets lost
+        based on the Cluster spacing seen so far.
+        Raises EOFError if there is no Cluster after the damage.
+        '''
+        damage_offset = self.file.tell()
+        start = damage_offset
+        if self.current_cluster_offset is not None and self.current_cluster_offset < damage_offset:
+            start = self.current_cluster_offset
+        elif self.element_offset is not None and self.element_offset < damage_offset:
+            start = self.element_offset
+        (offset, timecode) = find_cluster(self.recording.mmap, start+1, min_timecode=self.last_frameset_timecode)
+        end = offset if offset is not None else len(self.recording.mmap)
+
+        lost_framesets = None
+        if timecode is not None and self.last_frameset_timecode is not None and self.frameset_period:
+            lost_framesets = max(int(round((timecode - self.last_frameset_timecode)/self.frameset_period)) - 1, 0)
+        self.damaged_ranges.append({
+            "start": start,
+            "end": end,
+            "error": f"{type(error).__name__}: {error}" if error is not None else None,
+            "resume_timestamp": timecode*(self.timecode_scale*0.000000001) if timecode is not None else None,
+            "lost_framesets": lost_framesets,
+        })
+        sys.stderr.write("mkvparse: Damaged data at bytes %d-%d of '%s' (%s), %s\n" % (
+            start, end, self.filename, self.damaged_ranges[-1]["error"],
+            "end of file" if offset is None else f"resuming at the next Cluster (~{lost_framesets} framesets lost)"))
+
+        self.current_cluster_offset = None
+        self.current_cluster_end = None
+        if offset is None:
+            self.close()
+            raise EOFError(f"Reached end of file '{self.filename}'")
+        if lost_framesets:
+            self.frameset_num += lost_framesets
+        self.file.seek(offset)
+
+    def get_next_frameset(self):
+        '''
+        Returns the next frameset (see read_next_frameset()).
+        With recover=True, damaged data is skipped (see resync()) instead of raising an exception.
+        '''
+        while True:
+            try:
+                return self.read_next_frameset()
+            except EOFError:
+                raise
+            except Exception as e:
+                if not self.recover or self.file.closed:
+                    raise
+                self.resync(e)
+
+    def read_next_frameset(self):
+        if self.file.closed:
+            raise EOFError(f"Reached end of file '{self.filename}'")
+
+        frameset = Frameset()
         while not self.file.closed:
             (id_, size, hsize) = (None, None, None)
             tree = None
             data = None
             (type_, name) = (None, None)
+            self.element_offset = self.file.tell()
+            if self.current_cluster_end is not None and self.element_offset >= self.current_cluster_end:
+                # end of a Cluster of known size: it is complete without reading (possibly damaged) data after it
+                self.current_cluster_end = None
+                if frameset.track_frames:
+                    return self.finish_frameset(frameset)
             try:
                 (id_, size, hsize) = read_ebml_element_header(self.file)
+                if self.recover and size != -1 and self.element_offset+hsize+size > len(self.recording.mmap):
+                    raise RuntimeError(f"Element {id_:x} with size {size} at offset {self.element_offset} extends past the end of the file")
+                if self.current_cluster_end is not None and self.recover and (size == -1 or self.element_offset+hsize+size > self.current_cluster_end):
+                    raise RuntimeError(f"Element {id_:x} with size {size} at offset {self.element_offset} does not fit in its Cluster")
                 (type_, name) = element_types_names[id_]
+                if name=="Cues":
+                    # parsed on demand by get_cue_index()
+                    self.file.seek(size, 1)
+                    continue
                 if type_ == EET.MASTER:
                     tree = read_ebml_element_tree(self.file, size)
                     data = tree
             except StopIteration:
-                self.file.close()
-                raise EOFError(f"Reached end of file '{self.filename}'")
+                self.close()
+                # the last Cluster of the file is not followed by another Cluster header
+                if not frameset.track_frames:
+                    raise EOFError(f"Reached end of file '{self.filename}'")
+                return self.finish_frameset(frameset)
             
             if name in ("EBML", "Info", "Tracks") and type(data) == list:
                 raise RuntimeError("The read_metadata() function must be called exactly once before retrieving framesets.")
 
             if name=="Cluster":
-                if len(set(frameset.keys()).intersection(self.track_filter)) == 0:
+                if not frameset.track_frames:
+                    self.current_cluster_offset = self.file.tell() - hsize
+                    self.current_cluster_end = self.file.tell() + size if size != -1 else None
                     continue
-                self.frameset_num += 1
-                return frameset
+                # leave the file at the start of the next Cluster, so that it can be skipped as a whole
+                self.file.seek(-hsize, 1)
+                return self.finish_frameset(frameset)
 
             # cluster contents:
             elif name=="Timestamp" and type_ == EET.UNSIGNED:
                 data=read_fixedlength_number(self.file, size, False)
                 self.current_cluster_timecode = data
+                frameset.timestamp = data*(self.timecode_scale*0.000000001)
             elif name=="SimpleBlock" and type_ == EET.BINARY:
                 data=self.file.read(size)
                 self.handle_block(data, self.current_cluster_timecode, frameset, self.timecode_scale, None)
@@ -804,3 +1676,561 @@ class MKVReader():
             else:
                 if type_!=EET.JUST_GO_ON and type_!=EET.MASTER:
                     data = read_simple_element(self.file, type_, size)
+
+Cursor = MKVReader
+
+def encode_matroska_number(n, length=None):
+    """ Encode n as an EBML number (as in element sizes), using the smallest length unless given """
+    if length is None:
+        length = 1
+        while n >= 2**(7*length)-1:
+            length+=1
+    return (n | (1 << (7*length))).to_bytes(length, "big")
+
+def encode_element(id_, payload, size_length=None):
+    """ Encode a whole element: ID, size and payload """
+    return id_.to_bytes((id_.bit_length()+7)//8, "big") + encode_matroska_number(len(payload), size_length) + payload
+
+def encode_unsigned(id_, value, length=None):
+    """ Encode an UNSIGNED element, using the smallest length unless given """
+    if length is None:
+        length = max((value.bit_length()+7)//8, 1)
+    return encode_element(id_, value.to_bytes(length, "big"))
+
+def copy_file_bytes(src, dst, offset, length):
+    """ Copy length bytes from offset of file src to the current position of file dst,
+    in the kernel (os.copy_file_range) where possible """
+    dst.flush()
+    dst_offset = dst.tell()
+    copied = 0
+    if hasattr(os, "copy_file_range"):
+        try:
+            while copied < length:
+                n = os.copy_file_range(src.fileno(), dst.fileno(), length-copied, offset+copied, dst_offset+copied)
+                if n == 0:
+                    break
+                copied+=n
+        except OSError:
+            # e.g. not supported between these file systems, copy the rest in user space
+            pass
+    src.seek(offset+copied)
+    dst.seek(dst_offset+copied)
+    while copied < length:
+        buf = src.read(min(length-copied, 8*1024*1024))
+        if not buf:
+            raise EOFError(f"Reached end of file while copying {length} bytes from offset {offset}")
+        dst.write(buf)
+        copied+=len(buf)
+
+def filter_cluster(data, tracks):
+    '''
+        Rebuild the body of a Cluster from buffer, keeping only the blocks of the given tracks.
+        PrevSize and Position are dropped, as they are no longer valid in the new file.
+        Returns the new body, or None if no blocks are left
+    '''
+    out = []
+    blocks = 0
+    pos = 0
+    end = len(data)
+    while pos < end:
+        element_offset = pos
+        (id_, size, pos) = parse_element_header(data, pos)
+        if size == -1 or pos+size > end:
+            raise RuntimeError(f"Damaged Cluster: element {id_:x} with size {size} at offset {element_offset}")
+        if id_ == 0xA3: # SimpleBlock
+            (tracknum, _) = parse_matroska_number(data, pos)
+            if tracknum not in tracks:
+                pos+=size
+                continue
+            blocks+=1
+        elif id_ == 0xA0: # BlockGroup
+            tracknum = None
+            child_pos = pos
+            while child_pos < pos+size:
+                (cid, csize, child_pos) = parse_element_header(data, child_pos)
+                if cid == 0xA1: # Block
+                    (tracknum, _) = parse_matroska_number(data, child_pos)
+                    break
+                child_pos+=csize
+            if tracknum not in tracks:
+                pos+=size
+                continue
+            blocks+=1
+        elif id_ in (0xAB, 0xA7): # PrevSize, Position
+            pos+=size
+            continue
+        out.append(data[element_offset:pos+size])
+        pos+=size
+    if not blocks:
+        return None
+    return b"".join(out)
+
+def iter_child_elements(data, pos=0, end=None):
+    '''
+        Yields (id, element offset, data offset, end offset) of the elements in data[pos:end]
+    '''
+    if end is None:
+        end = len(data)
+    while pos < end:
+        element_offset = pos
+        (id_, size, pos) = parse_element_header(data, pos)
+        if size == -1 or pos+size > end:
+            raise RuntimeError(f"Damaged element {id_:x} with size {size} at offset {element_offset}")
+        yield (id_, element_offset, pos, pos+size)
+        pos+=size
+
+def filter_tracks(data, tracks):
+    '''
+        Rebuild the body of a Tracks element from buffer, keeping only the TrackEntry elements of the given tracks
+    '''
+    out = []
+    for (id_, offset, start, end) in iter_child_elements(data):
+        if id_ == 0xAE: # TrackEntry
+            number = None
+            for (cid, _, cstart, cend) in iter_child_elements(data, start, end):
+                if cid == 0xD7: # TrackNumber
+                    number = int.from_bytes(data[cstart:cend], "big")
+            if number not in tracks:
+                continue
+        out.append(data[offset:end])
+    return b"".join(out)
+
+def filter_tags(data, removed_uids):
+    '''
+        Rebuild the body of a Tags element from buffer without the tags of removed tracks:
+        Tags targeting only removed TrackUIDs are dropped, and so are Azure Kinect tags naming a removed track
+        (K4A_<name>_TRACK = TrackUID) together with the other K4A_<name>_* tags describing it.
+        K4A_DEPTH_MODE is kept while the IR track is, as it also describes the IR images.
+    '''
+    tags = []
+    removed_prefixes = set()
+    for (id_, offset, start, end) in iter_child_elements(data):
+        target_uids = []
+        simple_tags = []
+        if id_ == 0x7373: # Tag
+            for (cid, coffset, cstart, cend) in iter_child_elements(data, start, end):
+                if cid == 0x63C0: # Targets
+                    target_uids += [int.from_bytes(data[t_start:t_end], "big")
+                        for (tid, _, t_start, t_end) in iter_child_elements(data, cstart, cend) if tid == 0x63C5] # TagTrackUID
+                elif cid == 0x67C8: # SimpleTag
+                    fields = {tid: data[t_start:t_end] for (tid, _, t_start, t_end) in iter_child_elements(data, cstart, cend)}
+                    name = fields.get(0x45A3, b"").decode("utf-8", "replace") # TagName
+                    value = fields.get(0x4487, b"").decode("utf-8", "replace") # TagString
+                    simple_tags.append((name, coffset, cend))
+                    if name.startswith("K4A_") and name.endswith("_TRACK") and value.isdigit() and int(value) in removed_uids:
+                        removed_prefixes.add(name[:-len("TRACK")])
+        tags.append((id_, offset, start, end, target_uids, simple_tags))
+
+    def removed(name):
+        if name == "K4A_DEPTH_MODE" and "K4A_IR_" not in removed_prefixes:
+            return False
+        return any(name.startswith(prefix) for prefix in removed_prefixes)
+
+    out = []
+    for (id_, offset, start, end, target_uids, simple_tags) in tags:
+        if target_uids and all(uid in removed_uids for uid in target_uids):
+            continue
+        dropped = [(coffset, cend) for (name, coffset, cend) in simple_tags if removed(name)]
+        if not dropped:
+            out.append(data[offset:end])
+        elif len(dropped) < len(simple_tags):
+            body = b"".join(data[coffset:cend] for (_, coffset, _, cend) in iter_child_elements(data, start, end) if (coffset, cend) not in dropped)
+            out.append(encode_element(id_, body))
+    return b"".join(out)
+
+def read_child_ids(data, pos, end):
+    '''
+        Returns the set of IDs of the elements in data[pos:end] (e.g. the body of a Cluster), reading only their headers
+    '''
+    ids = set()
+    while pos < end:
+        (id_, size, pos) = parse_element_header(data, pos)
+        if size == -1:
+            break
+        ids.add(id_)
+        pos+=size
+    return ids
+
+def remux(src_path, dst_path, start=None, end=None, tracks=None):
+    '''
+    Losslessly copy a part of an Azure Kinect MKV file into a new MKV file, without decoding anything.
+
+    Keeps the Clusters with a timestamp in [start, end) (in seconds, same clock as frameset['timestamp'])
+    and, if tracks is given, only the blocks of those tracks. Clusters are copied as byte ranges unless
+    blocks have to be removed or they contain PrevSize/Position elements (which are dropped, see filter_cluster()).
+    The EBML header, Info (with updated Duration), Tracks, Attachments (calibration), Tags and Chapters are copied over,
+    leaving out the TrackEntry elements and tags of removed tracks (see filter_tracks() and filter_tags());
+    SeekHead and Cues are rewritten for the new layout.
+    Timestamps are kept as they are, so they still match the recording's clock.
+    The new file is written next to dst_path under a temporary name and only replaces dst_path once complete,
+    so an existing dst_path is left as it is if remux fails.
+    Raises ValueError if src_path and dst_path are the same file or no Clusters are selected.
+    Returns the number of Clusters written
+    '''
+    if os.path.exists(dst_path) and os.path.samefile(src_path, dst_path):
+        raise ValueError(f"Source and destination are the same file: '{src_path}'")
+    (dst_dir, dst_name) = os.path.split(os.path.abspath(dst_path))
+    tmp_path = os.path.join(dst_dir, f".{dst_name}.{os.getpid()}.tmp")
+    reader = MKVReader(src_path)
+    tmp_created = False
+    try:
+        src = reader.file
+        keep_tracks = set(tracks) if tracks is not None else set(reader.tracks)
+        if not keep_tracks.issubset(reader.tracks):
+            raise ValueError(f"Unknown tracks {sorted(keep_tracks - set(reader.tracks))} in '{reader.filename}'")
+        removed_uids = set(d['TrackUID'][1] for (n, d) in reader.tracks.items() if n not in keep_tracks and 'TrackUID' in d)
+        video_tracks = sorted(n for n in keep_tracks if reader.tracks[n].get('type') == 'video')
+        cue_track = video_tracks[0] if video_tracks else min(keep_tracks)
+        scale = reader.timecode_scale*0.000000001
+        if reader.first_cluster_offset is None:
+            raise RuntimeError(f"No Clusters in '{reader.filename}'")
+
+        # top-level elements in front of the first Cluster, plus those after it that the SeekHead points to
+        elements = {}
+        src.seek(reader.segment_offset)
+        while src.tell() < reader.first_cluster_offset:
+            offset = src.tell()
+            (id_, size, hsize) = read_ebml_element_header(src)
+            elements[offset] = (id_, hsize+size)
+            src.seek(size, 1)
+        for (id_, position) in reader.seek_positions.items():
+            offset = reader.segment_offset + position
+            if offset not in elements and offset > reader.first_cluster_offset:
+                src.seek(offset)
+                try:
+                    (cid, size, hsize) = read_ebml_element_header(src)
+                except StopIteration: # SeekHead pointing past the end of a truncated file
+                    continue
+                if cid == id_ and offset+hsize+size <= len(reader.recording.mmap):
+                    elements[offset] = (id_, hsize+size)
+        copied_ids = (0x1654AE6B, 0x1941A469, 0x1254C367, 0x1043A770) # Tracks, Attachments, Tags, Chapters
+        seek_ids = [0x1549A966] + list(dict.fromkeys(id_ for (_, (id_, _)) in sorted(elements.items()) if id_ in copied_ids)) + [0x1C53BB6B]
+
+        def encode_seekhead(positions):
+            # fixed size SeekPositions, so the SeekHead can be rewritten in place once the positions are known
+            return encode_element(0x114D9B74, b"".join(
+                encode_element(0x4DBB, encode_element(0x53AB, id_.to_bytes(4, "big")) + encode_unsigned(0x53AC, positions.get(id_, 0), 8))
+                for id_ in seek_ids))
+
+        with open(tmp_path, "x+b") as dst:
+            tmp_created = True
+            # EBML header, then the Segment with a fixed size length to be filled in at the end
+            src.seek(0)
+            (id_, size, hsize) = read_ebml_element_header(src)
+            copy_file_bytes(src, dst, 0, hsize+size)
+            dst.write(b"\x18\x53\x80\x67")
+            segment_size_offset = dst.tell()
+            dst.write(encode_matroska_number(0, 8))
+            segment_offset = dst.tell()
+            positions = {}
+            dst.write(encode_seekhead(positions))
+
+            # Info without Duration, a new Duration is appended at the end of it
+            info = b""
+            for (offset, (id_, length)) in sorted(elements.items()):
+                if id_ == 0x1549A966:
+                    src.seek(offset)
+                    (_, size, hsize) = read_ebml_element_header(src)
+                    body = src.read(size)
+                    pos = 0
+                    while pos < len(body):
+                        child_offset = pos
+                        (cid, csize, pos) = parse_element_header(body, pos)
+                        pos+=csize
+                        if cid != 0x4489: # Duration
+                            info += body[child_offset:pos]
+                    break
+            positions[0x1549A966] = dst.tell() - segment_offset
+            dst.write(encode_element(0x1549A966, info + encode_element(0x4489, b"\x00"*8)))
+            duration_offset = dst.tell() - 8
+
+            for (offset, (id_, length)) in sorted(elements.items()):
+                if id_ in copied_ids:
+                    positions.setdefault(id_, dst.tell() - segment_offset)
+                    if id_ in (0x1654AE6B, 0x1254C367) and removed_uids: # Tracks, Tags
+                        src.seek(offset)
+                        (_, size, hsize) = read_ebml_element_header(src)
+                        body = src.read(size)
+                        dst.write(encode_element(id_, filter_tracks(body, keep_tracks) if id_ == 0x1654AE6B else filter_tags(body, removed_uids)))
+                    else:
+                        copy_file_bytes(src, dst, offset, length)
+
+            # Clusters, starting from the closest cue if possible
+            src.seek(reader.first_cluster_offset)
+            if start is not None:
+                try:
+                    reader.seek(start)
+                except LookupError:
+                    pass
+            src = reader.file
+            cues = []
+            (last_timecode, period) = (None, 0)
+            while True:
+                try:
+                    (cluster_end, timecode) = reader.peek_cluster()
+                except EOFError:
+                    break
+                cluster_offset = src.tell()
+                if cluster_end is None or timecode is None:
+                    raise RuntimeError(f"Cluster at offset {cluster_offset} of '{reader.filename}' has an unknown size or no Timestamp")
+                if end is not None and timecode*scale >= end:
+                    break
+                if start is None or timecode*scale >= start:
+                    position = dst.tell() - segment_offset
+                    (_, size, hsize) = read_ebml_element_header(src)
+                    # PrevSize and Position would be wrong in the new file, so Clusters with them are rebuilt too
+                    if keep_tracks.issuperset(reader.tracks) and not read_child_ids(reader.recording.mmap, src.tell(), cluster_end) & {0xAB, 0xA7}:
+                        copy_file_bytes(src, dst, cluster_offset, cluster_end-cluster_offset)
+                    else:
+                        body = filter_cluster(src.read(size), keep_tracks)
+                        if body is not None:
+                            dst.write(encode_element(0x1F43B675, body, 8))
+                    if dst.tell() - segment_offset > position:
+                        cues.append((timecode, position))
+                        if last_timecode is not None:
+                            period = timecode - last_timecode
+                        last_timecode = timecode
+                src.seek(cluster_end)
+            if not cues:
+                raise ValueError(f"No Clusters with blocks of tracks {sorted(keep_tracks)} between {start} and {end} s in '{reader.filename}'")
+
+            positions[0x1C53BB6B] = dst.tell() - segment_offset
+            dst.write(encode_element(0x1C53BB6B, b"".join(
+                encode_element(0xBB, encode_unsigned(0xB3, timecode) + encode_element(0xB7, encode_unsigned(0xF7, cue_track) + encode_unsigned(0xF1, position)))
+                for (timecode, position) in cues)))
+
+            segment_end = dst.tell()
+            dst.seek(segment_size_offset)
+            dst.write(encode_matroska_number(segment_end - segment_offset, 8))
+            dst.write(encode_seekhead(positions))
+            dst.seek(duration_offset)
+            dst.write(pack(">d", float(last_timecode + period)))
+        os.replace(tmp_path, dst_path)
+    except BaseException:
+        if tmp_created and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        reader.close()
+    return len(cues)
+
+def tree_to_json(value):
+    '''
+        Convert parsed element values (element trees, bytes, ...) into something json.dumps() accepts
+    '''
+    if isinstance(value, bytes):
+        return binascii.hexlify(value).decode("ascii")
+    if isinstance(value, list):
+        d = {}
+        for (k, (t_, v)) in value:
+            d.setdefault(k, tree_to_json(v))
+        return d
+    if isinstance(value, dict):
+        return {str(k): tree_to_json(v[1] if isinstance(v, tuple) else v) for (k, v) in value.items()}
+    return value
+
+def ingest_metadata(filepath, output_prefix):
+    '''
+    Pipeline: dump Info, Tracks and calibration to <output_prefix>.json
+    Returns the number of framesets processed (0)
+    '''
+    with Recording(filepath) as recording:
+        out = {
+            "filename": recording.filename,
+            "info": tree_to_json(recording.file_metadata),
+            "tracks": tree_to_json(recording.tracks),
+            "calibration": recording.calibration,
+        }
+    with open(output_prefix + ".json", "w") as f:
+        json.dump(out, f, indent=2)
+    return 0
+
+def ingest_timeline(filepath, output_prefix):
+    '''
+    Pipeline: write the timestamp of every Cluster to <output_prefix>.timeline.csv,
+    reading only the Cluster headers where the Cluster sizes are known
+    Returns the number of Clusters processed
+    '''
+    n = 0
+    with MKVReader(filepath) as reader, open(output_prefix + ".timeline.csv", "w") as f:
+        f.write("index,timestamp\n")
+        while True:
+            try:
+                (end, timecode) = reader.peek_cluster()
+            except EOFError:
+                break
+            if end is None:
+                frameset = reader.get_next_frameset()
+                f.write(f"{frameset['index']},{frameset['timestamp']:.6f}\n")
+            else:
+                f.write(f"{n},{timecode*(reader.timecode_scale*0.000000001):.6f}\n")
+                reader.pass_cluster(end, timecode)
+            n += 1
+    return n
+
+def ingest_depth(filepath, output_prefix):
+    '''
+    Pipeline: export every depth image as a 16-bit PNG to <output_prefix>/depth_<index>.png
+    Returns the number of framesets processed
+    '''
+    os.makedirs(output_prefix, exist_ok=True)
+    n = 0
+    with MKVReader(filepath, track_filter=TRACK.DEPTH) as reader:
+        for frameset in reader.iter_framesets():
+            cv2.imwrite(os.path.join(output_prefix, f"depth_{frameset['index']:06d}.png"), frameset[TRACK.DEPTH].astype(np.uint16))
+            n += 1
+    return n
+
+INGEST_PIPELINES = {
+    "metadata": ingest_metadata,
+    "timeline": ingest_timeline,
+    "depth": ingest_depth,
+}
+
+def ingest_file(filepath, pipeline, output_prefix, retries=1):
+    '''
+    Run an ingest pipeline on a single file, writing its output to paths starting with output_prefix,
+    retrying it up to retries times on failure.
+    Runs in the worker processes of ingest(), so it never raises.
+    Returns (filepath, framesets, input bytes, seconds, attempts, error message or None)
+    '''
+    error = None
+    size = 0
+    t0 = time.perf_counter()
+    for attempt in range(1, retries+2):
+        try:
+            size = os.path.getsize(filepath)
+            os.makedirs(os.path.dirname(output_prefix) or ".", exist_ok=True)
+            framesets = INGEST_PIPELINES[pipeline](filepath, output_prefix)
+            return (filepath, framesets, size, time.perf_counter()-t0, attempt, None)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+    return (filepath, 0, size, time.perf_counter()-t0, retries+1, error)
+
+def find_mkv_files(directory, recursive=True):
+    '''
+    Returns the sorted paths of all .mkv files in directory
+    '''
+    found = []
+    for (root, dirs, files) in os.walk(directory):
+        found.extend(os.path.join(root, name) for name in files if name.lower().endswith(".mkv"))
+        if not recursive:
+            break
+    return sorted(found)
+
+def ingest(directory, pipeline="metadata", output_dir=None, workers=None, retries=1, recursive=True):
+    '''
+    Run an ingest pipeline over all MKV files in directory using a process pool,
+    printing progress and throughput as files complete. Failed files don't stop the batch.
+    Output paths mirror the subfolders of directory under output_dir.
+    At most workers files are in flight at a time. When a worker process dies, only the files that were
+    in flight are retried, each in a pool of its own so a crashing file can't make the others fail;
+    the remaining files continue in a new pool.
+    Returns the list of (filepath, error message) of the files that failed
+    '''
+    if pipeline not in INGEST_PIPELINES:
+        raise ValueError(f"Unknown pipeline '{pipeline}', choose from {', '.join(INGEST_PIPELINES)}")
+    if not os.path.isdir(directory):
+        raise NotADirectoryError(f"No such directory: '{directory}'")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+    if output_dir is None:
+        output_dir = directory
+    os.makedirs(output_dir, exist_ok=True)
+    filepaths = find_mkv_files(directory, recursive)
+    print(f"Ingesting {len(filepaths)} files from {directory} ({pipeline})", flush=True)
+
+    failed = []
+    (done, total_framesets, total_bytes) = (0, 0, 0)
+    t0 = time.perf_counter()
+
+    def report(filepath, framesets, size, seconds, attempts, error):
+        nonlocal done, total_framesets, total_bytes
+        done += 1
+        if error is None:
+            total_framesets += framesets
+            total_bytes += size
+        else:
+            failed.append((filepath, error))
+        elapsed = max(time.perf_counter()-t0, 0.000001)
+        status = "ok" if error is None else f"FAILED after {attempts} attempts ({error})"
+        print(f"[{done}/{len(filepaths)}] {os.path.relpath(filepath, directory)}: {status}, {framesets} framesets in {seconds:.2f} s | "
+              f"{done/elapsed:.2f} files/s, {total_framesets/elapsed:.1f} framesets/s, {total_bytes/elapsed/1e6:.1f} MB/s of input", flush=True)
+
+    pending = deque(filepaths)
+    suspects = deque() # files that were in flight when a worker died
+    crashes = {} # worker deaths while running alone, counted against retries
+    while pending or suspects:
+        isolated = bool(suspects)
+        (queue, pool_workers) = (deque([suspects.popleft()]), 1) if isolated else (pending, workers)
+        with ProcessPoolExecutor(pool_workers) as pool:
+            in_flight = {}
+            broken = False
+            while in_flight or (queue and not broken):
+                while queue and not broken and len(in_flight) < pool_workers:
+                    p = queue.popleft()
+                    output_prefix = os.path.join(output_dir, os.path.splitext(os.path.relpath(p, directory))[0])
+                    in_flight[pool.submit(ingest_file, p, pipeline, output_prefix, retries)] = p
+                (finished, _) = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    filepath = in_flight.pop(future)
+                    try:
+                        report(*future.result())
+                    except BrokenProcessPool as e:
+                        broken = True
+                        if isolated:
+                            crashes[filepath] = crashes.get(filepath, 0) + 1
+                        if crashes.get(filepath, 0) <= retries:
+                            suspects.append(filepath)
+                        else:
+                            report(filepath, 0, 0, 0.0, crashes[filepath], f"{type(e).__name__}: {e}")
+
+    elapsed = time.perf_counter()-t0
+    print(f"Done: {done-len(failed)} ok, {len(failed)} failed, {total_framesets} framesets, {total_bytes/1e6:.1f} MB of input in {elapsed:.2f} s", flush=True)
+    for (filepath, error) in failed:
+        sys.stderr.write(f"mkvparse: Failed to ingest {filepath}: {error}\n")
+    return failed
+
+def positive_int(value):
+    n = int(value)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return n
+
+def existing_directory(path):
+    if not os.path.isdir(path):
+        raise argparse.ArgumentTypeError(f"no such directory: '{path}'")
+    return path
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m mkv_reader", description="Azure Kinect MKV Reader")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    ingest_parser = subparsers.add_parser("ingest", help="run a pipeline over all MKV files in a directory")
+    ingest_parser.add_argument("directory", type=existing_directory)
+    ingest_parser.add_argument("-p", "--pipeline", choices=list(INGEST_PIPELINES), default="metadata")
+    ingest_parser.add_argument("-o", "--output-dir", help="defaults to the input directory")
+    ingest_parser.add_argument("-j", "--workers", type=positive_int, help="number of worker processes, defaults to the number of CPUs")
+    ingest_parser.add_argument("-r", "--retries", type=int, default=1, help="retries per failed file")
+    ingest_parser.add_argument("--no-recursive", dest="recursive", action="store_false")
+    remux_parser = subparsers.add_parser("remux", help="losslessly copy a time range and/or a subset of tracks to a new MKV file")
+    remux_parser.add_argument("source")
+    remux_parser.add_argument("destination")
+    remux_parser.add_argument("-s", "--start", type=float, help="start timestamp in seconds (inclusive)")
+    remux_parser.add_argument("-e", "--end", type=float, help="end timestamp in seconds (exclusive)")
+    remux_parser.add_argument("-t", "--tracks", type=int, nargs="+", help=f"track numbers to keep (COLOR={TRACK.COLOR}, DEPTH={TRACK.DEPTH}, IR={TRACK.IR}, IMU={TRACK.IMU})")
+    args = parser.parse_args(argv)
+
+    if args.command == "ingest":
+        failed = ingest(args.directory, args.pipeline, args.output_dir, args.workers, args.retries, args.recursive)
+        return 1 if failed else 0
+    elif args.command == "remux":
+        t0 = time.perf_counter()
+        clusters = remux(args.source, args.destination, args.start, args.end, args.tracks)
+        elapsed = max(time.perf_counter()-t0, 0.000001)
+        print(f"Wrote {clusters} clusters, {os.path.getsize(args.destination)/1e6:.1f} MB in {elapsed:.2f} s", flush=True)
+        return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+'''
+Synthetic Azure Kinect-like MKV files for the tests and benchmarks.
+
+Every Cluster i holds a Timestamp, an MJPEG color frame filled with i, a 320x288 depth image filled with i,
+an IR image filled with 1000+i and an IMU block, so the frameset a Cluster came from can be told from its pixels.
+'''
+import json
+from struct import pack
+import cv2
+import numpy as np
+from mkv_reader import encode_element, encode_unsigned, encode_matroska_number, TRACK
+
+DEPTH_SHAPE = (288, 320)
+
+def encode_string(id_, value):
+    return encode_element(id_, value.encode())
+
+def encode_simple_block(track, payload, keyframe=True):
+    return encode_element(0xA3, encode_matroska_number(track) + pack(">hB", 0, 0x80 if keyframe else 0) + payload)
+
+def encode_cues(rows, track=TRACK.COLOR):
+    '''
+    Cues element for (timecode, position relative to the Segment data) rows
+    '''
+    return encode_element(0x1C53BB6B, b"".join(
+        encode_element(0xBB, encode_unsigned(0xB3, timecode) + encode_element(0xB7, encode_unsigned(0xF7, track) + encode_unsigned(0xF1, position)))
+        for (timecode, position) in rows))
+
+def make_cluster(i, timecode, extra=b""):
+    color = np.full((48, 64, 3), i % 256, np.uint8)
+    body = encode_unsigned(0xE7, timecode) + extra
+    body += encode_simple_block(TRACK.COLOR, cv2.imencode(".jpg", color)[1].tobytes())
+    body += encode_simple_block(TRACK.DEPTH, np.full(DEPTH_SHAPE, i, ">i2").tobytes())
+    body += encode_simple_block(TRACK.IR, np.full(DEPTH_SHAPE, 1000+i, ">i2").tobytes())
+    body += encode_simple_block(TRACK.IMU, b"\x00"*32)
+    return encode_element(0x1F43B675, body, 8)
+
+def make_recording(path, nclusters=30, fps=30, cues=True, tags=b"", cluster_extra=b""):
+    '''
+    Write a recording of nclusters Clusters at fps with a SeekHead, calibration attachment and (optionally) Cues.
+    tags is the body of a Tags element to include, cluster_extra is added to every Cluster after its Timestamp.
+    Returns the absolute file offsets of the Clusters.
+    '''
+    timecode_scale = 1000 # microseconds, as in Azure Kinect recordings
+    ebml = encode_element(0x1A45DFA3, encode_unsigned(0x4286, 1) + encode_string(0x4282, "matroska") + encode_unsigned(0x4287, 4) + encode_unsigned(0x4285, 2))
+    info = encode_element(0x1549A966, encode_unsigned(0x2AD7B1, timecode_scale) + encode_string(0x4D80, "synthetic") + encode_string(0x5741, "synthetic"))
+    def track_entry(number, name, codec, track_type=0x01):
+        return encode_element(0xAE, encode_unsigned(0xD7, number) + encode_unsigned(0x73C5, number) + encode_unsigned(0x83, track_type)
+            + encode_string(0x536E, name) + encode_string(0x86, codec))
+    tracks = encode_element(0x1654AE6B, track_entry(TRACK.COLOR, "COLOR", "V_MJPEG") + track_entry(TRACK.DEPTH, "DEPTH", "V_MS/VFW/FOURCC")
+        + track_entry(TRACK.IR, "IR", "V_MS/VFW/FOURCC") + track_entry(TRACK.IMU, "IMU", "S_K4A/IMU", 0x11))
+    calibration = json.dumps({"CalibrationInformation": {"Cameras": [], "synthetic": True}})
+    attachments = encode_element(0x1941A469, encode_element(0x61A7, encode_string(0x466E, "calibration.json")
+        + encode_string(0x4660, "application/octet-stream") + encode_string(0x465C, calibration) + encode_unsigned(0x46AE, 1)))
+    front = [(0x1549A966, info), (0x1654AE6B, tracks), (0x1941A469, attachments)]
+    if tags:
+        front.append((0x1254C367, encode_element(0x1254C367, tags)))
+
+    def seekhead(positions):
+        return encode_element(0x114D9B74, b"".join(
+            encode_element(0x4DBB, encode_element(0x53AB, id_.to_bytes(4, "big")) + encode_unsigned(0x53AC, position, 8))
+            for (id_, position) in positions))
+    seek_ids = [id_ for (id_, _) in front] + ([0x1C53BB6B] if cues else [])
+    position = len(seekhead([(id_, 0) for id_ in seek_ids]))
+    positions = []
+    for (id_, data) in front:
+        positions.append((id_, position))
+        position += len(data)
+
+    period = int(round(1000000/fps))
+    clusters = []
+    rows = []
+    for i in range(nclusters):
+        rows.append((i*period, position))
+        clusters.append(make_cluster(i, i*period, cluster_extra))
+        position += len(clusters[-1])
+    if cues:
+        positions.append((0x1C53BB6B, position))
+
+    body = seekhead(positions) + b"".join(data for (_, data) in front) + b"".join(clusters) + (encode_cues(rows) if cues else b"")
+    with open(path, "wb") as f:
+        f.write(ebml)
+        f.write(b"\x18\x53\x80\x67" + encode_matroska_number(len(body), 8))
+        segment_offset = f.tell()
+        f.write(body)
+    return [segment_offset + position for (_, position) in rows]
@@ -0,0 +1,164 @@
+import io
+import os
+import numpy as np
+import pytest
+from mkv_reader import (MKVReader, Recording, TRACK, parse_cues, read_ebml_element_tree, read_ebml_element_header,
+    remux, filter_cluster, encode_element, encode_unsigned)
+from synthetic import make_recording, encode_cues, encode_simple_block, DEPTH_SHAPE
+
+@pytest.fixture
+def recording(tmp_path):
+    path = str(tmp_path / "recording.mkv")
+    offsets = make_recording(path, 30)
+    return (path, offsets)
+
+def depth_values(reader, **kwargs):
+    return [(fs['index'], int(fs[TRACK.DEPTH][0, 0])) for fs in reader.iter_framesets(**kwargs)]
+
+def test_read_all_framesets(recording):
+    (path, _) = recording
+    with MKVReader(path) as reader:
+        framesets = list(reader.iter_framesets())
+    assert [fs['index'] for fs in framesets] == list(range(30))
+    assert all(int(fs[TRACK.DEPTH][0, 0]) == fs['index'] for fs in framesets)
+    assert framesets[0][TRACK.DEPTH].shape == DEPTH_SHAPE
+    assert framesets[0].keys() == ['index', 'timestamp', TRACK.COLOR, TRACK.DEPTH, TRACK.IR]
+    assert len(framesets[0]) == len(framesets[0].keys())
+    assert framesets[0].is_keyframe(TRACK.DEPTH)
+
+def test_parse_cues_matches_tree():
+    rows = [(i*33, 1000 + i*370000) for i in range(1, 500)]
+    cues = encode_cues(rows)
+    f = io.BytesIO(cues)
+    (_, size, _) = read_ebml_element_header(f)
+    body = f.read(size)
+    tree = read_ebml_element_tree(io.BytesIO(body), size)
+    (times, tracks, positions, _) = parse_cues(body)
+    assert times.tolist() == [dict(point)['CueTime'][1] for (_, (_, point)) in tree]
+    assert positions.tolist() == [position for (_, position) in rows]
+    assert set(tracks.tolist()) == {TRACK.COLOR}
+
+def test_seek_and_subsampling(recording):
+    (path, _) = recording
+    reader = MKVReader(path)
+    assert reader.seek(0.5) == pytest.approx(0.5, abs=0.0001)
+    assert int(reader.get_next_frameset()[TRACK.DEPTH][0, 0]) == 15
+    assert [i for (i, _) in depth_values(MKVReader(path), step=10)] == [0, 10, 20]
+    assert [v for (_, v) in depth_values(MKVReader(path), target_fps=10)] == [0, 3, 6, 9, 12, 15, 18, 21, 24, 27]
+
+def test_recover_zeroed_cluster_id(recording):
+    (path, offsets) = recording
+    with open(path, "r+b") as f:
+        f.seek(offsets[10])
+        f.write(b"\x00"*4)
+    reader = MKVReader(path, recover=True)
+    values = depth_values(reader)
+    assert values == [(i, i) for i in range(30) if i != 10]
+    assert len(reader.damaged_ranges) == 1
+    assert reader.damaged_ranges[0]["start"] == offsets[10]
+    assert reader.damaged_ranges[0]["end"] == offsets[11]
+
+def test_recover_damaged_size_while_skipping(recording):
+    (path, offsets) = recording
+    with open(path, "r+b") as f:
+        f.seek(offsets[10] + 4)
+        f.write(b"\x01\x7f\xff\xff\xff\xff\xff\xfe")
+    reader = MKVReader(path, recover=True)
+    assert [i for (i, _) in depth_values(reader, step=3)][:5] == [0, 3, 6, 9, 13]
+    assert reader.damaged_ranges[0]["start"] == offsets[10]
+
+@pytest.mark.parametrize("cut", [5000, 200000])
+def test_recover_truncated_tail(recording, cut):
+    (path, offsets) = recording
+    with open(path, "r+b") as f:
+        f.truncate(offsets[20] + cut)
+    reader = MKVReader(path, recover=True)
+    assert depth_values(reader) == [(i, i) for i in range(20)]
+    assert [d["start"] for d in reader.damaged_ranges] == [offsets[20]]
+
+def test_seekhead_pointing_past_eof(recording, tmp_path):
+    (path, offsets) = recording
+    with open(path, "r+b") as f:
+        f.truncate(offsets[25])
+    with pytest.raises(LookupError):
+        MKVReader(path).seek(0.5)
+    out = str(tmp_path / "out.mkv")
+    assert remux(path, out, start=0.5) == 9
+    assert [v for (_, v) in depth_values(MKVReader(out))] == list(range(16, 25))
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "empty.mkv"
+    path.write_bytes(b"")
+    with pytest.raises(EOFError):
+        Recording(str(path))
+
+def test_remux_roundtrip(recording, tmp_path):
+    (path, _) = recording
+    out = str(tmp_path / "out.mkv")
+    assert remux(path, out) == 30
+    with MKVReader(path) as a, MKVReader(out) as b:
+        assert [(fs['timestamp'], fs[TRACK.DEPTH].tobytes()) for fs in a.iter_framesets()] == \
+            [(fs['timestamp'], fs[TRACK.DEPTH].tobytes()) for fs in b.iter_framesets()]
+        assert b.get_calibration() == a.get_calibration()
+    clip = str(tmp_path / "clip.mkv")
+    assert remux(path, clip, start=0.5, end=0.7) == 6
+    reader = MKVReader(clip)
+    assert reader.seek(0.6) == pytest.approx(0.6, abs=0.0001)
+    assert int(reader.get_next_frameset()[TRACK.DEPTH][0, 0]) == 18
+
+def test_remux_track_subset(recording, tmp_path):
+    (path, _) = recording
+    out = str(tmp_path / "depth.mkv")
+    assert remux(path, out, tracks=[TRACK.DEPTH]) == 30
+    with MKVReader(out) as reader:
+        assert sorted(reader.tracks) == [TRACK.DEPTH]
+        assert [v for (_, v) in depth_values(reader)] == list(range(30))
+
+def test_remux_tags_of_removed_tracks(tmp_path):
+    def tag(name, value, uid=None):
+        targets = encode_element(0x63C0, encode_unsigned(0x63C5, uid) if uid is not None else b"")
+        return encode_element(0x7373, targets + encode_element(0x67C8, encode_element(0x45A3, name.encode()) + encode_element(0x4487, value.encode())))
+    tags = tag("K4A_COLOR_TRACK", "1") + tag("K4A_COLOR_MODE", "MJPG_720P") + tag("K4A_DEPTH_TRACK", "2") \
+        + tag("K4A_DEVICE_SERIAL_NUMBER", "000123") + tag("TITLE", "color", uid=1)
+    path = str(tmp_path / "tags.mkv")
+    make_recording(path, 3, tags=tags)
+    out = str(tmp_path / "out.mkv")
+    remux(path, out, tracks=[TRACK.DEPTH])
+    data = open(out, "rb").read()
+    assert b"K4A_DEPTH_TRACK" in data and b"K4A_DEVICE_SERIAL_NUMBER" in data
+    assert b"K4A_COLOR" not in data and b"TITLE" not in data
+
+def test_remux_same_path_rejected(recording):
+    (path, _) = recording
+    before = os.path.getsize(path)
+    with pytest.raises(ValueError):
+        remux(path, path, start=0.5)
+    assert os.path.getsize(path) == before
+
+def test_remux_empty_selection_keeps_existing_output(recording, tmp_path):
+    (path, _) = recording
+    out = tmp_path / "out.mkv"
+    out.write_bytes(b"existing")
+    with pytest.raises(ValueError):
+        remux(path, str(out), start=100)
+    assert out.read_bytes() == b"existing"
+    assert sorted(os.listdir(tmp_path)) == ["out.mkv", "recording.mkv"]
+
+def test_remux_drops_prevsize_and_position(tmp_path):
+    path = str(tmp_path / "prev.mkv")
+    make_recording(path, 4, cluster_extra=encode_unsigned(0xA7, 12345) + encode_unsigned(0xAB, 999))
+    out = str(tmp_path / "out.mkv")
+    assert remux(path, out) == 4
+    with Recording(out) as recording:
+        for position in recording.get_cue_index().cluster_positions:
+            f = recording.open()
+            f.seek(int(position))
+            (_, size, _) = read_ebml_element_header(f)
+            body = f.read(size)
+            assert filter_cluster(body, set(recording.tracks)) == body
+
+def test_filter_cluster():
+    blocks = [encode_simple_block(track, bytes([track])*8) for track in (TRACK.COLOR, TRACK.DEPTH, TRACK.IR)]
+    body = encode_unsigned(0xE7, 5) + encode_unsigned(0xAB, 100) + b"".join(blocks)
+    assert filter_cluster(body, {TRACK.DEPTH}) == encode_unsigned(0xE7, 5) + blocks[1]
+    assert filter_cluster(body, {TRACK.IMU}) is None